@@ -12,6 +12,9 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
     
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # Lower (e.g. 4) only in test environments
+    
     # OpenAI
     OPENAI_API_KEY: str = ""
     
@@ -44,6 +47,10 @@ class Settings(BaseSettings):
     # Frontend API Authentication
     FRONTEND_API_KEY: str = "your-frontend-api-key-change-in-production"
     FRONTEND_API_SECRET: str = "your-frontend-api-secret-change-in-production"
+    # Also accept signatures made with the old sha256(secret:hour_seed) client
+    # secret while deployed frontends move to the HMAC derivation; set to False
+    # once every frontend release signs with HMAC
+    ACCEPT_LEGACY_CLIENT_SECRET: bool = True
     
     # Email - Gmail SMTP
     GMAIL_EMAIL: str = ""  # Your Gmail address
@@ -1,9 +1,17 @@
 import motor.motor_asyncio
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
 from app.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
 
 class Database:
     client: motor.motor_asyncio.AsyncIOMotorClient = None
     database: motor.motor_asyncio.AsyncIOMotorDatabase = None
+    # False until the unique username index is confirmed to exist; signup
+    # keeps its username pre-check while it is missing
+    username_index_ready: bool = False
 
 db = Database()
 
@@ -31,14 +39,53 @@ async def close_mongo_connection():
     """Close database connection"""
     db.client.close()
 
+# Queries must also filter on {"$type": "string"} for the planner to use the
+# partial profession index (see the admin profession stats pipeline)
+PROFESSION_INDEX_FILTER = {"profession": {"$type": "string"}}
+
 async def create_indexes():
     """Create database indexes for optimal performance"""
     users_collection = db.database.users
     
-    # Create indexes
-    await users_collection.create_index("email", unique=True)
-    await users_collection.create_index("designation")
-    await users_collection.create_index("location")
-    await users_collection.create_index("skills.name")
-    await users_collection.create_index("is_looking_for_job")
-    await users_collection.create_index([("name", "text"), ("designation", "text"), ("summary", "text")])
\ No newline at end of file
+    # Create all indexes in a single createIndexes command (one round-trip).
+    # Don't add a single-field index that is a leading prefix of a compound
+    # index here - MongoDB serves those queries from the compound index, and
+    # the extra index only costs writes and RAM.
+    await users_collection.create_indexes([
+        IndexModel("email", unique=True),
+        IndexModel("designation"),
+        IndexModel("location"),
+        IndexModel("skills.name"),
+        IndexModel("is_looking_for_job"),
+        IndexModel([("name", "text"), ("designation", "text"), ("summary", "text")]),
+        # Admin profession stats only look at users with a string profession
+        # (users who never set one store null), so index just those documents
+        IndexModel("profession", partialFilterExpression=PROFESSION_INDEX_FILTER),
+    ])
+    
+    # Enforces username uniqueness at write time (signup inserts and catches
+    # DuplicateKeyError); documents without a username are left out. Built on
+    # its own so that usernames duplicated before this index existed only fail
+    # this build - they must be cleaned up by hand - instead of failing startup
+    # and every other index with it. Until it exists, signup falls back to
+    # checking the username before inserting (see db.username_index_ready).
+    try:
+        await users_collection.create_index(
+            "username",
+            unique=True,
+            partialFilterExpression={"username": {"$type": "string"}}
+        )
+        db.username_index_ready = True
+    except OperationFailure as e:
+        # Without this index inserts cannot reject duplicate usernames, so make
+        # the failure loud and name the usernames that need resolving
+        duplicates = await users_collection.aggregate([
+            {"$match": {"username": {"$type": "string"}}},
+            {"$group": {"_id": "$username", "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": 20}
+        ]).to_list(length=20)
+        logger.error(
+            f"❌ [DATABASE] Could not build unique username index: {str(e)}. "
+            f"Duplicate usernames to resolve: {[dup['_id'] for dup in duplicates]}"
+        )
\ No newline at end of file
@@ -192,11 +192,6 @@ async def cleanup_dummy_users(
             detail="Add ?confirm=true to confirm deletion of dummy users"
         )
     
-    # Delete users with dummy password hash pattern
-    # This is a safety measure to only delete users created by the script
-    from passlib.context import CryptContext
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-    
     # Find users created in the last 24 hours with default password
     from datetime import timedelta
     cutoff_date = datetime.utcnow() - timedelta(hours=24)
@@ -230,7 +225,7 @@ async def get_admin_stats(
     
     # Count users by profession
     pipeline = [
-        {"$match": {"profession": {"$exists": True, "$ne": None}}},
+        {"$match": {"profession": {"$type": "string"}}},  # Matches the partial profession index
         {"$group": {"_id": "$profession", "count": {"$sum": 1}}},
         {"$sort": {"count": -1}},
         {"$limit": 10}
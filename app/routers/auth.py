@@ -3,6 +3,7 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel, EmailStr, Field
+from pymongo.errors import DuplicateKeyError
 from app.models.user import UserCreate, UserResponse, UserInDB
 from app.services.auth_service import AuthService
 from app.services.email_service import email_service
@@ -10,6 +11,7 @@ from app.services.google_oauth_service import GoogleOAuthService
 from app.utils.security import create_access_token, create_refresh_token, verify_token
 from app.utils.username_generator import UsernameGenerator
 from app.config import settings
+from app.database import db
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,13 +31,15 @@ async def register(user: UserCreate):
             detail=error_message
         )
     
-    # Check if username is available
-    is_available = await UsernameGenerator.is_username_available(user.username)
-    if not is_available:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username is already taken"
-        )
+    # Only needed while the unique username index is missing - otherwise the
+    # insert below rejects taken usernames
+    if not db.username_index_ready:
+        is_available = await UsernameGenerator.is_username_available(user.username)
+        if not is_available:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Username is already taken"
+            )
     
     # Check if user already exists
     existing_user = await auth_service.get_user_by_email(user.email)
@@ -45,8 +49,16 @@ async def register(user: UserCreate):
             detail="Email already registered"
         )
     
-    # Create new user
-    new_user = await auth_service.create_user(user)
+    # Create new user - the unique indexes on username/email reject duplicates,
+    # which also covers two concurrent signups racing for the same username
+    try:
+        new_user = await auth_service.create_user(user)
+    except DuplicateKeyError as e:
+        key_pattern = (e.details or {}).get("keyPattern", {})
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered" if "email" in key_pattern else "Username is already taken"
+        )
     
     # Generate tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -384,8 +396,17 @@ async def google_oauth(oauth_request: GoogleOAuthRequest):
                 profile_picture_url=google_user_info.get('picture', '')
             )
             
-            user = await auth_service.create_user(new_user_data)
-            print(f"✅ [GOOGLE OAUTH] New user created: {user.email} with username: {generated_username}")
+            # Another signup may claim the generated username first; regenerate and retry
+            for attempt in range(3):
+                try:
+                    user = await auth_service.create_user(new_user_data)
+                    break
+                except DuplicateKeyError as e:
+                    key_pattern = (e.details or {}).get("keyPattern", {})
+                    if "username" not in key_pattern or attempt == 2:
+                        raise
+                    new_user_data.username = await UsernameGenerator.generate_username_from_name(google_user_info['name'])
+            print(f"✅ [GOOGLE OAUTH] New user created: {user.email} with username: {new_user_data.username}")
         
         # Generate tokens
         access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -403,7 +403,7 @@ async def create_dummy_users(db = Depends(get_database)):
     """
     ADMIN ONLY: Create realistic dummy users for testing
     """
-    from app.utils.security import get_password_hash
+    from app.utils.security import aget_password_hash
     from datetime import datetime
     from app.models.user import OnboardingProgress, OnboardingStepStatus, WorkPreferences
     
@@ -1354,7 +1354,7 @@ async def create_dummy_users(db = Depends(get_database)):
         for user_data in dummy_users:
             # Hash password
             password = user_data.pop("password")
-            hashed_password = get_password_hash(password)
+            hashed_password = await aget_password_hash(password)
             
             # Create completed onboarding progress
             onboarding_progress = {
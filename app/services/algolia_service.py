@@ -212,6 +212,25 @@ class AlgoliaService:
             traceback.print_exc()
             return False
     
+    async def sync_users_batch(self, users: List[UserInDB], batch_size: int = 1000) -> int:
+        """Sync many users to Algolia with batched save_objects requests, returning the count synced"""
+        if not users:
+            return 0
+        
+        try:
+            algolia_records = [self._format_user_for_algolia(user) for user in users]
+            await self.client.save_objects(
+                index_name=self.index_name,
+                objects=algolia_records,
+                batch_size=batch_size
+            )
+            logger.info(f"✅ [ALGOLIA] Batch synced {len(algolia_records)} users to Algolia")
+            return len(algolia_records)
+            
+        except Exception as e:
+            logger.error(f"❌ [ALGOLIA] Failed to batch sync {len(users)} users to Algolia: {str(e)}")
+            return 0
+    
     async def delete_user_from_algolia(self, user_id: str) -> bool:
         """Delete a user from Algolia index"""
         try:
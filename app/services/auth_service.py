@@ -2,7 +2,7 @@ from typing import Optional
 from bson import ObjectId
 from app.database import get_database
 from app.models.user import UserCreate, UserInDB
-from app.utils.security import get_password_hash, verify_password
+from app.utils.security import aget_password_hash, averify_password
 from datetime import datetime, timedelta
 import secrets
 
@@ -42,7 +42,7 @@ class AuthService:
         db = await get_database()
         
         # Hash password
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await aget_password_hash(user.password)
         
         # Create user document
         user_dict = user.dict()
@@ -69,7 +69,7 @@ class AuthService:
         if not user:
             return None
         
-        if not verify_password(password, user.hashed_password):
+        if not await averify_password(password, user.hashed_password):
             return None
         
         return user
@@ -170,7 +170,7 @@ class AuthService:
         """Reset user password and clear reset token"""
         try:
             # Hash new password
-            hashed_password = get_password_hash(new_password)
+            hashed_password = await aget_password_hash(new_password)
             
             db = await get_database()
             result = await db.users.update_one(
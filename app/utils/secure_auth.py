@@ -2,35 +2,77 @@ import hashlib
 import hmac
 import time
 import secrets
+import threading
 from typing import Optional, Dict, Any
+from cachetools import TTLCache
 from fastapi import HTTPException, Request, status
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Origins allowed to call signed endpoints (exact match for Origin, prefix match for Referer).
+# Scheme and host compare case-insensitively, so everything is stored lower-cased.
+VALID_ORIGINS_SET = frozenset(origin.lower() for origin in (
+    "http://localhost:3000",
+    "https://cvchatter.com",
+    "https://www.cvchatter.com",
+))
+VALID_ORIGIN_PREFIXES = tuple(VALID_ORIGINS_SET)
+
 class SecureAPIAuth:
     def __init__(self):
         self.allowed_origins = settings.BACKEND_CORS_ORIGINS
         self.secret_key = settings.FRONTEND_API_SECRET
+        self.accept_legacy_secret = settings.ACCEPT_LEGACY_CLIENT_SECRET
         self.request_timeout = 300  # 5 minutes
+        self.max_clock_skew = 30  # Allowed seconds a client clock may run ahead
+        # Last (hour_seed, secret, hmac_template, legacy_hmac_template) - the
+        # secret only changes once per hour
+        self._secret_cache: Optional[tuple] = None
+        # Recently seen (nonce, timestamp) pairs, kept for the whole replay
+        # window - a timestamp up to max_clock_skew ahead stays valid that much longer
+        self._nonce_seen = TTLCache(maxsize=100000, ttl=self.request_timeout + self.max_clock_skew)
+        self._nonce_lock = threading.Lock()
         
     def generate_client_secret(self) -> str:
         """Generate a rotating secret for client-side signing"""
         timestamp = int(time.time())
         # Generate secret that rotates every hour
         hour_seed = timestamp // 3600
-        return hashlib.sha256(f"{self.secret_key}:{hour_seed}".encode()).hexdigest()[:32]
+        cached = self._secret_cache
+        if cached and cached[0] == hour_seed:
+            return cached[1]
+        
+        # Keyed HMAC rather than sha256(key:seed), which is open to length extension
+        client_secret = hmac.new(
+            self.secret_key.encode('utf-8'),
+            str(hour_seed).encode('utf-8'),
+            hashlib.sha256
+        ).hexdigest()[:32]
+        # Keyed HMAC context for this hour; copied per request instead of re-keyed
+        hmac_template = hmac.new(client_secret.encode('utf-8'), digestmod=hashlib.sha256)
+        
+        # Transition window: frontends released before the HMAC derivation still
+        # derive the secret as sha256(key:seed)
+        legacy_template = None
+        if self.accept_legacy_secret:
+            legacy_secret = hashlib.sha256(f"{self.secret_key}:{hour_seed}".encode()).hexdigest()[:32]
+            legacy_template = hmac.new(legacy_secret.encode('utf-8'), digestmod=hashlib.sha256)
+        
+        self._secret_cache = (hour_seed, client_secret, hmac_template, legacy_template)
+        return client_secret
     
     def verify_request_signature(self, request: Request) -> bool:
         """Verify request signature with multiple validation layers"""
         try:
             # 1. Check required headers
-            timestamp = request.headers.get("X-Timestamp")
-            signature = request.headers.get("X-Signature")
-            nonce = request.headers.get("X-Nonce")
+            headers = request.headers
+            timestamp = headers.get("x-timestamp")
+            signature = headers.get("x-signature")
+            nonce = headers.get("x-nonce")
             
-            if not all([timestamp, signature, nonce]):
+            if not (timestamp and signature and nonce):
                 logger.warning("Missing required security headers")
                 return False
             
@@ -38,33 +80,54 @@ class SecureAPIAuth:
             try:
                 request_time = int(timestamp)
                 current_time = int(time.time())
-                if abs(current_time - request_time) > self.request_timeout:
+                if current_time - request_time > self.request_timeout:
                     logger.warning(f"Request timestamp too old: {request_time} vs {current_time}")
                     return False
+                if request_time - current_time > self.max_clock_skew:
+                    logger.warning(f"Request timestamp in the future: {request_time} vs {current_time}")
+                    return False
             except ValueError:
                 logger.warning("Invalid timestamp format")
                 return False
             
             # 3. Verify origin and referrer
-            origin = request.headers.get("Origin")
-            referrer = request.headers.get("Referer")
+            origin = headers.get("origin")
+            referrer = headers.get("referer")
             
             if not self._is_valid_origin(origin, referrer):
                 logger.warning(f"Invalid origin: {origin}, referrer: {referrer}")
                 return False
             
-            # 4. Verify signature
-            client_secret = self.generate_client_secret()
+            # 4. Reject already-used nonces before doing any HMAC work
+            if self._nonce_used(nonce, timestamp):
+                logger.warning(f"Replayed request nonce: {nonce}")
+                return False
+            
+            # 5. Verify signature (URL is only stringified once all cheap checks pass)
             expected_signature = self._generate_signature(
                 request.method,
                 str(request.url),
                 timestamp,
-                nonce,
-                client_secret
+                nonce
             )
             
             if not hmac.compare_digest(signature, expected_signature):
-                logger.warning("Invalid request signature")
+                legacy_signature = self._generate_signature(
+                    request.method,
+                    str(request.url),
+                    timestamp,
+                    nonce,
+                    legacy=True
+                )
+                if legacy_signature is None or not hmac.compare_digest(signature, legacy_signature):
+                    logger.warning("Invalid request signature")
+                    return False
+                logger.info("Request signed with the legacy sha256-derived client secret")
+            
+            # 6. Only signed requests consume their nonce, so unsigned floods
+            # can neither burn nor evict legitimate ones
+            if not self._register_nonce(nonce, timestamp):
+                logger.warning(f"Replayed request nonce: {nonce}")
                 return False
             
             return True
@@ -73,41 +136,55 @@ class SecureAPIAuth:
             logger.error(f"Error verifying request signature: {str(e)}")
             return False
     
+    def _nonce_used(self, nonce: str, timestamp: str) -> bool:
+        """Check whether a request nonce was already used, without recording it"""
+        with self._nonce_lock:
+            return (nonce, timestamp) in self._nonce_seen
+    
+    def _register_nonce(self, nonce: str, timestamp: str) -> bool:
+        """Record a request nonce, returning False if it was already used"""
+        key = (nonce, timestamp)
+        with self._nonce_lock:
+            if key in self._nonce_seen:
+                return False
+            self._nonce_seen[key] = None
+        return True
+    
     def _is_valid_origin(self, origin: Optional[str], referrer: Optional[str]) -> bool:
         """Validate request origin and referrer"""
         if not origin and not referrer:
             return False
         
-        valid_origins = [
-            "http://localhost:3000",
-            "https://cvchatter.com", 
-            "https://www.cvchatter.com", 
-        ]
-        
-        if origin and origin not in valid_origins:
+        if origin and origin.lower() not in VALID_ORIGINS_SET:
             return False
         
-        if referrer:
-            for valid_origin in valid_origins:
-                if referrer.startswith(valid_origin):
-                    return True
+        if referrer and not referrer.lower().startswith(VALID_ORIGIN_PREFIXES):
             return False
         
         return True
     
-    def _generate_signature(self, method: str, url: str, timestamp: str, nonce: str, secret: str) -> str:
-        """Generate HMAC signature for request"""
-        # Create signature string
-        sig_string = f"{method}:{url}:{timestamp}:{nonce}"
-        
-        # Generate HMAC
-        signature = hmac.new(
-            secret.encode('utf-8'),
-            sig_string.encode('utf-8'),
-            hashlib.sha256
-        ).hexdigest()
+    def _generate_signature(self, method: str, url: str, timestamp: str, nonce: str, legacy: bool = False) -> Optional[str]:
+        """Generate HMAC signature for request using the current hour's client secret
+        (or the legacy sha256-derived one; None when legacy secrets are not accepted)"""
+        # Refresh the cached secret/HMAC context if the hour rolled over
+        self.generate_client_secret()
+        
+        template = self._secret_cache[3] if legacy else self._secret_cache[2]
+        if template is None:
+            return None
+        
+        # Feed "method:url:timestamp:nonce" into a copy of the pre-keyed context
+        # piecewise, rather than building and encoding the joined string
+        mac = template.copy()
+        mac.update(method.encode('utf-8'))
+        mac.update(b":")
+        mac.update(url.encode('utf-8'))
+        mac.update(b":")
+        mac.update(timestamp.encode('utf-8'))
+        mac.update(b":")
+        mac.update(nonce.encode('utf-8'))
         
-        return signature
+        return mac.hexdigest()
     
     def verify_ip_rate_limit(self, client_ip: str) -> bool:
         """Simple IP-based rate limiting (in production, use Redis)"""
@@ -165,8 +242,14 @@ class SecureAPIClient {
         // This should match your backend's secret generation logic
         // In production, get this from a secure endpoint
         const encoder = new TextEncoder();
-        const data = encoder.encode(`your-secret-key:${seed}`);
-        const hashBuffer = await crypto.subtle.digest('SHA-256', data);
+        const key = await crypto.subtle.importKey(
+            'raw',
+            encoder.encode('your-secret-key'),
+            { name: 'HMAC', hash: 'SHA-256' },
+            false,
+            ['sign']
+        );
+        const hashBuffer = await crypto.subtle.sign('HMAC', key, encoder.encode(String(seed)));
         const hashArray = Array.from(new Uint8Array(hashBuffer));
         const hashHex = hashArray.map(b => b.toString(16).padStart(2, '0')).join('');
         return hashHex.substring(0, 32);
@@ -1,9 +1,21 @@
 import re
 import secrets
-import hashlib
 from typing import Optional
 from app.database import get_database
 
+_NON_ALNUM_SPACE = re.compile(r'[^a-z0-9\s]')
+_WHITESPACE = re.compile(r'\s+')
+_USERNAME_ALLOWED = re.compile(r'^[a-z0-9_-]+$')
+_USERNAME_ENDS = re.compile(r'^[a-z0-9].*[a-z0-9]$')
+_USERNAME_SINGLE = re.compile(r'^[a-z0-9]$')
+
+RESERVED_USERNAMES = frozenset({
+    'admin', 'root', 'api', 'www', 'ftp', 'mail', 'email', 'user', 'test',
+    'support', 'help', 'info', 'contact', 'about', 'privacy', 'terms',
+    'login', 'register', 'signin', 'signup', 'auth', 'oauth', 'profile',
+    'dashboard', 'home', 'index', 'search', 'blog', 'news', 'system'
+})
+
 class UsernameGenerator:
     """Utility class for generating unique usernames"""
     
@@ -14,10 +26,10 @@ class UsernameGenerator:
         normalized = full_name.strip().lower()
         
         # Remove special characters and keep only alphanumeric characters and spaces
-        normalized = re.sub(r'[^a-z0-9\s]', '', normalized)
+        normalized = _NON_ALNUM_SPACE.sub('', normalized)
         
         # Replace spaces with underscores
-        normalized = re.sub(r'\s+', '_', normalized)
+        normalized = _WHITESPACE.sub('_', normalized)
         
         # Remove leading/trailing underscores
         normalized = normalized.strip('_')
@@ -27,18 +39,9 @@ class UsernameGenerator:
     @staticmethod
     def generate_unique_suffix() -> str:
         """Generate a unique 4-character suffix that's memorable"""
-        # Use a combination of timestamp and random data for uniqueness
-        import time
-        timestamp = str(int(time.time()))[-4:]  # Last 4 digits of timestamp
-        random_part = secrets.token_hex(2)  # 4 character hex string
-        
-        # Mix them to create a 4-character suffix
-        combined = timestamp + random_part
-        hash_obj = hashlib.md5(combined.encode())
-        hex_hash = hash_obj.hexdigest()
-        
-        # Take first 4 characters of hash
-        return hex_hash[:4]
+        # 16 bits of CSPRNG output as 4 hex characters - no digest needed, which
+        # also keeps MD5 out of this module for FIPS-restricted deployments
+        return secrets.token_hex(2)
     
     @staticmethod
     async def generate_username_from_name(full_name: str, max_attempts: int = 10) -> str:
@@ -56,16 +59,26 @@ class UsernameGenerator:
         if len(base_username) > 26:
             base_username = base_username[:26]
         
-        # First, try the base username without suffix
-        if await UsernameGenerator.is_username_available(base_username):
-            return base_username
+        # Base username first, then suffixed variants - all checked in a single query
+        candidates = [base_username] + [
+            f"{base_username}_{UsernameGenerator.generate_unique_suffix()}"
+            for _ in range(max_attempts)
+        ]
+        
+        try:
+            taken = {
+                doc["username"]
+                async for doc in db.users.find(
+                    {"username": {"$in": candidates}},
+                    {"username": 1, "_id": 0}
+                )
+            }
+        except Exception:
+            # If there's any error, treat all candidates as taken for safety
+            taken = set(candidates)
         
-        # If base is taken, try with unique suffixes
-        for attempt in range(max_attempts):
-            suffix = UsernameGenerator.generate_unique_suffix()
-            candidate = f"{base_username}_{suffix}"
-            
-            if await UsernameGenerator.is_username_available(candidate):
+        for candidate in candidates:
+            if candidate not in taken:
                 return candidate
         
         # Fallback: use timestamp-based username
@@ -80,7 +93,8 @@ class UsernameGenerator:
         """Check if username is available in database"""
         try:
             db = await get_database()
-            existing_user = await db.users.find_one({"username": username})
+            # Only existence matters - don't pull the whole profile over the wire
+            existing_user = await db.users.find_one({"username": username}, {"_id": 1})
             return existing_user is None
         except Exception:
             # If there's any error, assume username is not available for safety
@@ -99,26 +113,19 @@ class UsernameGenerator:
             return False, "Username must be no more than 30 characters long"
         
         # Check if username contains only allowed characters
-        if not re.match(r'^[a-z0-9_-]+$', username):
+        if not _USERNAME_ALLOWED.match(username):
             return False, "Username can only contain lowercase letters, numbers, underscores, and hyphens"
         
         # Check if username starts and ends with alphanumeric character
-        if not re.match(r'^[a-z0-9].*[a-z0-9]$', username):
+        if not _USERNAME_ENDS.match(username):
             if len(username) == 1:
-                if not re.match(r'^[a-z0-9]$', username):
+                if not _USERNAME_SINGLE.match(username):
                     return False, "Username must start with a letter or number"
             else:
                 return False, "Username must start and end with a letter or number"
         
         # Check for reserved usernames
-        reserved_usernames = {
-            'admin', 'root', 'api', 'www', 'ftp', 'mail', 'email', 'user', 'test',
-            'support', 'help', 'info', 'contact', 'about', 'privacy', 'terms',
-            'login', 'register', 'signin', 'signup', 'auth', 'oauth', 'profile',
-            'dashboard', 'home', 'index', 'search', 'blog', 'news', 'system'
-        }
-        
-        if username.lower() in reserved_usernames:
+        if username.lower() in RESERVED_USERNAMES:
             return False, "This username is reserved and cannot be used"
         
         return True, None
\ No newline at end of file
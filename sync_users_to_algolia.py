@@ -4,6 +4,7 @@ Sync all users from MongoDB to Algolia
 This script will fetch all users from the database and sync them to Algolia search index
 """
 
+import argparse
 import asyncio
 import sys
 import os
@@ -12,14 +13,126 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 from app.config import settings
 from app.services.algolia_service import AlgoliaService
 from app.models.user import UserInDB
 from app.services.profile_scoring_service import ProfileScoringService
 from datetime import datetime
+from typing import Any, Dict, List, Tuple
 import traceback
 
-async def sync_all_users_to_algolia():
+# Users per Algolia save_objects request
+ALGOLIA_BATCH_SIZE = 1000
+# Algolia batches allowed in flight at once
+ALGOLIA_CONCURRENCY = 4
+# profile_score updates per bulk_write
+SCORE_BATCH_SIZE = 500
+
+# Fields that neither profile scoring nor the Algolia record reads (all have
+# UserInDB defaults), left on the server to cut transfer and BSON decoding.
+# The request-timestamp arrays grow with every request a user makes.
+SYNC_EXCLUDED_FIELDS = {
+    field: 0 for field in (
+        "job_matching_request_timestamps",
+        "chat_request_timestamps",
+        "refresh_token_jti",
+        "refresh_token_expires_at",
+        "password_reset_token",
+        "password_reset_expires_at",
+        "google_id",
+        "additional_info",
+        "expected_salary",
+        "current_salary",
+        "work_preferences",
+        "onboarding_progress",
+        "section_order",
+    )
+}
+
+# Defaults for fields older user documents may lack. The empty lists/dicts are
+# shared across users, which is safe because UserInDB validation copies them.
+USER_DEFAULTS = {
+    'designation': '',
+    'location': '',
+    'summary': '',
+    'experience': '',
+    'skills': [],
+    'experience_details': [],
+    'projects': [],
+    'certifications': [],
+    'contact_info': {},
+    'education': [],
+    'languages': [],
+    'awards': [],
+    'publications': [],
+    'volunteer_experience': [],
+    'interests': [],
+    'onboarding_completed': True,
+}
+
+def prepare_users(
+    docs: List[Dict[str, Any]],
+    profile_scoring_service: ProfileScoringService,
+    verbose: bool = False
+) -> Tuple[List[UserInDB], List[UpdateOne], int]:
+    """Build UserInDB models for a batch of user documents, scoring users that have no score yet.
+    Returns the models, the profile_score updates to write back and the number of failed documents."""
+    users: List[UserInDB] = []
+    score_ops: List[UpdateOne] = []
+    failed = 0
+    # Timestamp for users that have none, shared by the whole batch
+    now = datetime.utcnow()
+    
+    for user_data in docs:
+        try:
+            if verbose:
+                print(f"\n🔄 Processing user: {user_data.get('name', 'Unknown')} (ID: {user_data.get('_id')})")
+            
+            # Store the original _id for database updates
+            original_id = user_data['_id']
+            
+            # Convert MongoDB document to UserInDB model
+            user_data['id'] = str(user_data['_id'])  # Convert ObjectId to string
+            # Remove the original _id field to avoid conflicts
+            del user_data['_id']
+            
+            # Handle missing fields with defaults (stored values win)
+            user_data = {**USER_DEFAULTS, 'created_at': now, 'updated_at': now, **user_data}
+            
+            # Handle profession field
+            if 'profession' not in user_data:
+                user_data['profession'] = user_data.get('designation', '')
+            
+            user = UserInDB(**user_data)
+            
+            # Calculate profile score if not exists (the scorer reads the model,
+            # so this runs once it is built)
+            if not user.profile_score:
+                if verbose:
+                    print(f"  📈 Calculating profile score...")
+                user.profile_score = profile_scoring_service.calculate_profile_score(user)
+                
+                # Queue the database update using the original _id
+                score_ops.append(UpdateOne(
+                    {"_id": original_id},
+                    {"$set": {"profile_score": user.profile_score}}
+                ))
+                if verbose:
+                    print(f"  ✅ Profile score calculated: {user.profile_score}")
+            elif verbose:
+                print(f"  📊 Existing profile score: {user.profile_score}")
+            
+            users.append(user)
+            
+        except Exception as model_error:
+            print(f"  ❌ Error creating UserInDB model: {str(model_error)}")
+            print(f"  📋 User data keys: {list(user_data.keys())}")
+            failed += 1
+    
+    return users, score_ops, failed
+
+async def sync_all_users_to_algolia(verbose: bool = False):
     """Sync all users from database to Algolia"""
     
     # Initialize services
@@ -27,102 +140,85 @@ async def sync_all_users_to_algolia():
     profile_scoring_service = ProfileScoringService()
     
     # Connect to MongoDB
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    # One client for the whole run; wire compression shrinks the full user
+    # documents streamed back from Atlas (zstd when installed, else zlib)
+    client = AsyncIOMotorClient(
+        settings.MONGODB_URL,
+        serverSelectionTimeoutMS=5000,
+        compressors="zstd,zlib"
+    )
     db = client[settings.DATABASE_NAME]
     users_collection = db.users
     
     try:
         print("🔄 Starting sync of all users to Algolia...")
         
-        # Get all users from database
-        users_cursor = users_collection.find({})
-        users_list = await users_cursor.to_list(length=None)
-        
-        print(f"📊 Found {len(users_list)} users in database")
+        # Stream users from the database rather than loading them all up front
+        users_cursor = users_collection.find({}, SYNC_EXCLUDED_FIELDS, batch_size=500)
         
+        processed_count = 0
         synced_count = 0
         error_count = 0
+        # Raw documents waiting to be turned into one Algolia batch
+        docs: List[Dict[str, Any]] = []
+        # Batches are sent in the background while later users are prepared;
+        # the semaphore caps how many are in flight (and held in memory)
+        algolia_slots = asyncio.Semaphore(ALGOLIA_CONCURRENCY)
+        pending_batches: List[asyncio.Task] = []
+        # Newly calculated profile scores waiting to be written back in bulk
+        score_ops: List[UpdateOne] = []
         
-        for user_data in users_list:
+        async def flush_scores():
             try:
-                print(f"\n🔄 Processing user: {user_data.get('name', 'Unknown')} (ID: {user_data.get('_id')})")
-                
-                # Store the original _id for database updates
-                original_id = user_data['_id']
-                
-                # Convert MongoDB document to UserInDB model
-                user_data['id'] = str(user_data['_id'])  # Convert ObjectId to string
-                # Remove the original _id field to avoid conflicts
-                del user_data['_id']
-                
-                # Calculate profile score if not exists
-                if 'profile_score' not in user_data or user_data.get('profile_score', 0) == 0:
-                    print(f"  📈 Calculating profile score...")
-                    profile_score = profile_scoring_service.calculate_profile_score(user_data)
-                    user_data['profile_score'] = profile_score
-                    
-                    # Update in database using the original _id
-                    await users_collection.update_one(
-                        {"_id": original_id}, 
-                        {"$set": {"profile_score": profile_score}}
-                    )
-                    print(f"  ✅ Profile score calculated and saved: {profile_score}")
-                else:
-                    print(f"  📊 Existing profile score: {user_data.get('profile_score')}")
-                
-                # Create UserInDB model instance
-                try:
-                    # Handle missing fields with defaults
-                    user_data.setdefault('designation', '')
-                    user_data.setdefault('location', '')
-                    user_data.setdefault('summary', '')
-                    user_data.setdefault('experience', '')
-                    user_data.setdefault('skills', [])
-                    user_data.setdefault('experience_details', [])
-                    user_data.setdefault('projects', [])
-                    user_data.setdefault('certifications', [])
-                    user_data.setdefault('contact_info', {})
-                    user_data.setdefault('education', [])
-                    user_data.setdefault('languages', [])
-                    user_data.setdefault('awards', [])
-                    user_data.setdefault('publications', [])
-                    user_data.setdefault('volunteer_experience', [])
-                    user_data.setdefault('interests', [])
-                    user_data.setdefault('onboarding_completed', True)
-                    user_data.setdefault('created_at', datetime.utcnow())
-                    user_data.setdefault('updated_at', datetime.utcnow())
-                    
-                    # Handle profession field
-                    if 'profession' not in user_data:
-                        user_data['profession'] = user_data.get('designation', '')
-                    
-                    user = UserInDB(**user_data)
-                    
-                    # Sync to Algolia
-                    print(f"  🔄 Syncing to Algolia...")
-                    success = await algolia_service.sync_user_to_algolia(user)
-                    
-                    if success:
-                        synced_count += 1
-                        print(f"  ✅ Successfully synced to Algolia")
-                    else:
-                        error_count += 1
-                        print(f"  ❌ Failed to sync to Algolia")
-                        
-                except Exception as model_error:
-                    print(f"  ❌ Error creating UserInDB model: {str(model_error)}")
-                    print(f"  📋 User data keys: {list(user_data.keys())}")
-                    error_count += 1
-                    
-            except Exception as user_error:
-                print(f"  ❌ Error processing user: {str(user_error)}")
-                traceback.print_exc()
-                error_count += 1
+                await users_collection.bulk_write(score_ops, ordered=False)
+            except Exception as e:
+                print(f"❌ Failed to save {len(score_ops)} profile scores: {str(e)}")
+            score_ops.clear()
+        
+        async def send_batch(users: List[UserInDB]):
+            nonlocal synced_count, error_count
+            try:
+                synced = await algolia_service.sync_users_batch(users, ALGOLIA_BATCH_SIZE)
+            finally:
+                algolia_slots.release()
+            synced_count += synced
+            error_count += len(users) - synced
+            print(f"📤 Synced {synced}/{len(users)} users to Algolia")
+        
+        async def flush_docs():
+            nonlocal error_count
+            # Pydantic validation and scoring are CPU work - run them in a worker
+            # thread so in-flight Algolia batches keep progressing
+            users, new_score_ops, failed = await asyncio.to_thread(
+                prepare_users, docs.copy(), profile_scoring_service, verbose
+            )
+            docs.clear()
+            error_count += failed
+            
+            score_ops.extend(new_score_ops)
+            if len(score_ops) >= SCORE_BATCH_SIZE:
+                await flush_scores()
+            
+            if users:
+                await algolia_slots.acquire()
+                pending_batches.append(asyncio.create_task(send_batch(users)))
+        
+        async for user_data in users_cursor:
+            processed_count += 1
+            docs.append(user_data)
+            if len(docs) >= ALGOLIA_BATCH_SIZE:
+                await flush_docs()
+        
+        if docs:
+            await flush_docs()
+        if score_ops:
+            await flush_scores()
+        await asyncio.gather(*pending_batches)
         
         print(f"\n📊 Sync Summary:")
         print(f"  ✅ Successfully synced: {synced_count}")
         print(f"  ❌ Errors: {error_count}")
-        print(f"  📦 Total processed: {len(users_list)}")
+        print(f"  📦 Total processed: {processed_count}")
         
         if synced_count > 0:
             print(f"\n🎉 Sync completed! {synced_count} users are now searchable in Algolia")
@@ -137,5 +233,9 @@ async def sync_all_users_to_algolia():
         print("🔌 Database connection closed")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sync all users from MongoDB to Algolia")
+    parser.add_argument("--verbose", action="store_true", help="Print a line for every processed user")
+    args = parser.parse_args()
+    
     print("🚀 Starting Algolia sync script...")
-    asyncio.run(sync_all_users_to_algolia())
\ No newline at end of file
+    asyncio.run(sync_all_users_to_algolia(verbose=args.verbose))
\ No newline at end of file